@@ -3,10 +3,50 @@ import serial
 import time
 import threading
 import os
-from collections import deque
+import queue
+import shutil
+import subprocess
 from datetime import datetime
+from typing import NamedTuple
 import numpy as np
 
+# Size of the live preview window (half of the 1280x720 capture)
+DISPLAY_SIZE = (640, 360)
+
+# Description of each combination of the low four light bits, in the
+# order RED, GREEN, Left Off-target, Right Off-target
+LIGHT_DESC = [
+    ', '.join(name for bit, name in ((0x04, "RED"), (0x08, "GREEN"),
+                                     (0x01, "Left Off-target"), (0x02, "Right Off-target"))
+              if lights & bit) or 'None'
+    for lights in range(16)
+]
+
+# ffmpeg H.264 encoder arguments for clips
+NVENC_ARGS = ['-c:v', 'h264_nvenc', '-preset', 'p1', '-tune', 'll']
+X264_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast']
+
+# Byte offsets of the decoded fields within a 10-byte Favero packet
+PACKET_FIELDS = (
+    ('right_score', 1),
+    ('left_score', 2),
+    ('seconds', 3),
+    ('minutes', 4),
+    ('lights', 5),
+    ('matches', 6),
+    ('cards', 8),
+)
+
+class FaveroPacket(NamedTuple):
+    """Decoded fields of a Favero packet"""
+    right_score: int
+    left_score: int
+    seconds: int
+    minutes: int
+    lights: int
+    matches: int
+    cards: int
+
 class FencingVideoRecorder:
     def __init__(self, serial_port='COM3', baud_rate=9600, camera_index=0, test_mode=False, test_file=None):
         # Serial connection to FA5 scoring machine
@@ -18,42 +58,91 @@ class FencingVideoRecorder:
         self.test_mode = test_mode
         self.test_file = test_file
         self.test_data = None
+        self.test_packets = None
+        self.test_fields = None
         self.test_position = 0
         
         # Video capture
         self.camera = cv2.VideoCapture(camera_index)
+        # Request MJPG and skip the driver's BGR conversion so that, where the
+        # backend supports it, frames arrive already JPEG-compressed
+        self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
         self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
         self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
         self.camera.set(cv2.CAP_PROP_FPS, 30)
         
         # Rolling buffer to store last 60 seconds of video
-        self.video_buffer = deque(maxlen=1800)  # 30fps * 60 seconds
+        # Fixed ring of JPEG-encoded frames (~10-20x smaller than raw BGR)
+        # with their time.monotonic() capture times in a parallel float64
+        # array; both are indexed by a rotating write position
+        self.buffer_size = 1800  # 30fps * 60 seconds
+        self.ring_frames = [None] * self.buffer_size
+        self.ring_timestamps = np.full(self.buffer_size, -np.inf)
+        self.ring_index = 0
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, 85]
+        self.buffer_lock = threading.Lock()
+        
+        # Most recent raw frame, handed from capture to display
+        self.latest_frame = None
+        self.latest_frame_lock = threading.Lock()
         
         # State tracking
+        # Action state is written by the serial thread (or the manual-mode
+        # input loop) and read by the display thread; state_lock guards the
+        # recording start/stop transitions. The rolling buffer and latest
+        # frame have their own locks, and clip writes go through clip_queue.
+        self.state_lock = threading.Lock()
         self.last_timer = None
         self.recording_start_time = None
         self.currently_recording = False
         self.last_packet = None
+        self.last_raw_packet = None
         
         # Threading control
         self.running = False
         self.video_thread = None
+        self.display_thread = None
         self.serial_thread = None
         
+        # Clip saves are queued and written by a dedicated thread
+        self.clip_queue = queue.Queue()
+        self.clip_writer_thread = None
+        
         # Output directory
         self.output_dir = "fencing_clips"
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # ffmpeg encoder arguments for clips (None = fall back to OpenCV)
+        self.ffmpeg_path = shutil.which('ffmpeg')
+        self.clip_encoder = self.select_clip_encoder()
+        
         print("🤺 Fencing Video Recorder Initialized")
         print(f"📁 Clips will be saved to: {self.output_dir}")
     
+    def select_clip_encoder(self):
+        """Pick ffmpeg H.264 encoder arguments, preferring NVENC"""
+        if not self.ffmpeg_path:
+            return None
+        
+        try:
+            result = subprocess.run([self.ffmpeg_path, '-hide_banner', '-encoders'],
+                                    capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        
+        if 'h264_nvenc' in result.stdout:
+            return NVENC_ARGS
+        return X264_ARGS
+    
     def connect_scoring_machine(self):
         """Connect to FA5 scoring machine via serial or load test data"""
         if self.test_mode:
             if self.test_file and os.path.exists(self.test_file):
                 with open(self.test_file, 'rb') as f:
                     self.test_data = f.read()
-                print(f"✅ Loaded test data from {self.test_file} ({len(self.test_data)} bytes)")
+                valid = self.preparse_test_data()
+                print(f"✅ Loaded test data from {self.test_file} ({len(self.test_data)} bytes, {valid} valid packets)")
                 return True
             else:
                 print("✅ Test mode enabled - using simulated data")
@@ -72,32 +161,44 @@ class FencingVideoRecorder:
         if len(packet) != 10 or packet[0] != 0xFF:
             return None
         
-        # Verify checksum
-        checksum = sum(packet[:9]) % 256
+        # Verify checksum (sum of bytes 0-8, computed without slicing)
+        checksum = (sum(packet) - packet[9]) & 0xFF
         if checksum != packet[9]:
             return None
         
-        return {
-            'right_score': packet[1],
-            'left_score': packet[2], 
-            'seconds': packet[3],
-            'minutes': packet[4],
-            'lights': packet[5],
-            'matches': packet[6],
-            'cards': packet[8]
-        }
+        return FaveroPacket(
+            right_score=packet[1],
+            left_score=packet[2],
+            seconds=packet[3],
+            minutes=packet[4],
+            lights=packet[5],
+            matches=packet[6],
+            cards=packet[8]
+        )
+    
+    def preparse_test_data(self):
+        """Validate all test packets in a single vectorized pass"""
+        raw = np.frombuffer(self.test_data, np.uint8)
+        packets = raw[:len(raw) - len(raw) % 10].reshape(-1, 10)
+        
+        # Accumulating in uint8 wraps at 256, which is exactly the checksum
+        checksums = packets[:, :9].sum(axis=1, dtype=np.uint8)
+        valid = (packets[:, 0] == 0xFF) & (checksums == packets[:, 9])
+        self.test_packets = packets[valid]
+        
+        # Decoded fields per packet, in FaveroPacket order
+        self.test_fields = self.test_packets[:, [offset for _, offset in PACKET_FIELDS]]
+        self.test_position = 0
+        return len(self.test_packets)
     
     def get_test_packet(self):
-        """Get next packet from test data"""
-        if not self.test_data or self.test_position >= len(self.test_data):
+        """Get next packet from test data, already validated and decoded"""
+        if self.test_fields is None or self.test_position >= len(self.test_fields):
             return None
         
-        if self.test_position + 10 <= len(self.test_data):
-            packet = self.test_data[self.test_position:self.test_position + 10]
-            self.test_position += 10
-            return packet
-        
-        return None
+        data = FaveroPacket(*self.test_fields[self.test_position].tolist())
+        self.test_position += 1
+        return data
     
     def simulate_realistic_packet(self):
         """Generate realistic packets for demo"""
@@ -139,51 +240,96 @@ class FencingVideoRecorder:
             self._right_score = getattr(self, '_right_score', 0) + 1
         
         return bytes(packet)
+    
+    def simulate_batch(self, n):
+        """Generate n realistic packets at once as an (n, 10) uint8 array"""
+        rng = np.random.default_rng()
+        packets = np.zeros((n, 10), np.uint8)
+        if n == 0:
+            return packets
+        
+        # Timer counts down 180..0 and wraps, continuing from the last packet
+        start = (self._sim_timer - 1) % 181 if hasattr(self, '_sim_timer') else 180
+        timers = (start - np.arange(n)) % 181
+        
+        # Occasionally simulate hits
+        hits = rng.random(n) < 0.05  # 5% chance per packet
+        lights = np.where(hits, rng.choice([0x04, 0x08, 0x0C], n), 0)  # Red, Green, or Both
+        left_hits = (lights & 0x04) != 0
+        right_hits = (lights & 0x08) != 0
+        
+        # Each packet carries the scores from before its own hit
+        left_scores = getattr(self, '_left_score', 0) + np.cumsum(left_hits) - left_hits
+        right_scores = getattr(self, '_right_score', 0) + np.cumsum(right_hits) - right_hits
+        
+        packets[:, 0] = 0xFF  # Start
+        packets[:, 1] = right_scores
+        packets[:, 2] = left_scores
+        packets[:, 3] = timers % 60
+        packets[:, 4] = timers // 60
+        packets[:, 5] = lights
+        packets[:, 6] = 1  # Match 1
+        packets[:, 9] = packets[:, :9].sum(axis=1, dtype=np.uint8)  # Checksum
+        
+        # Carry state over so single and batch generation can be mixed
+        self._sim_timer = int(timers[-1])
+        self._left_score = int(left_scores[-1] + left_hits[-1])
+        self._right_score = int(right_scores[-1] + right_hits[-1])
+        
+        return packets
+    
+    def detect_clip_events(self, data):
         """Detect start/end of fencing action"""
-        current_timer = (data['minutes'] * 60) + data['seconds']
-        lights = data['lights']
-        hit_detected = lights & 0x0C  # Red (bit 2) or Green (bit 3) lights
-        
-        # START: Timer counting down (time decreased)
-        if (self.last_timer is not None and 
-            current_timer < self.last_timer and 
-            not self.currently_recording):
+        with self.state_lock:
+            current_timer = (data.minutes * 60) + data.seconds
+            lights = data.lights
+            hit_detected = lights & 0x0C  # Red (bit 2) or Green (bit 3) lights
             
-            self.recording_start_time = time.time()
-            self.currently_recording = True
-            print(f"⚔️ ACTION STARTED at {data['minutes']}:{data['seconds']:02d}")
-        
-        # END: Hit detected while recording
-        elif hit_detected and self.currently_recording:
-            clip_end_time = time.time()
-            self.save_video_clip(self.recording_start_time, clip_end_time, data)
-            self.currently_recording = False
+            # START: Timer counting down (time decreased)
+            if (self.last_timer is not None and 
+                current_timer < self.last_timer and 
+                not self.currently_recording):
+                
+                self.recording_start_time = time.monotonic()
+                self.currently_recording = True
+                print(f"⚔️ ACTION STARTED at {data.minutes}:{data.seconds:02d}")
             
-        # TIMEOUT: Timer stopped but no hit (halt called)
-        elif (self.last_timer == current_timer and 
-              self.currently_recording and 
-              time.time() - self.recording_start_time > 15):  # 15 second timeout
+            # END: Hit detected while recording
+            elif hit_detected and self.currently_recording:
+                clip_end_time = time.monotonic()
+                self.save_video_clip(self.recording_start_time, clip_end_time, data)
+                self.currently_recording = False
+                
+            # TIMEOUT: Timer stopped but no hit (halt called)
+            elif (self.last_timer == current_timer and 
+                  self.currently_recording and 
+                  time.monotonic() - self.recording_start_time > 15):  # 15 second timeout
+                
+                clip_end_time = time.monotonic()
+                print("⏸️ Action timeout - saving clip anyway")
+                self.save_video_clip(self.recording_start_time, clip_end_time, data)
+                self.currently_recording = False
             
-            clip_end_time = time.time()
-            print("⏸️ Action timeout - saving clip anyway")
-            self.save_video_clip(self.recording_start_time, clip_end_time, data)
-            self.currently_recording = False
-        
-        self.last_timer = current_timer
+            self.last_timer = current_timer
     
     def save_video_clip(self, start_time, end_time, score_data):
-        """Extract and save video clip from buffer"""
+        """Extract clip frames from buffer and queue them for writing"""
         clip_duration = end_time - start_time
         
         # Add 1 second buffer before and after
         buffer_start = start_time - 1.0
         buffer_end = end_time + 1.0
         
-        # Find frames in time range
-        clip_frames = []
-        for frame, timestamp in self.video_buffer:
-            if buffer_start <= timestamp <= buffer_end:
-                clip_frames.append(frame)
+        # Find frames in time range - timestamps are monotonic, so binary
+        # search for the slice instead of scanning the whole buffer
+        with self.buffer_lock:
+            # The oldest entry sits at the write index; rotate it to the
+            # front so timestamps are ascending (unused slots are -inf)
+            start = self.ring_index
+            timestamps = np.roll(self.ring_timestamps, -start)
+            lo = np.searchsorted(timestamps, buffer_start, side='left')
+            hi = np.searchsorted(timestamps, buffer_end, side='right')
+            clip_frames = (self.ring_frames[start:] + self.ring_frames[:start])[lo:hi]
         
         if len(clip_frames) < 10:  # Need at least 10 frames
             print("❌ Not enough frames for clip")
@@ -191,64 +337,230 @@ class FencingVideoRecorder:
         
         # Generate filename with timestamp and scores
         now = datetime.now()
-        filename = f"clip_{now.strftime('%Y%m%d_%H%M%S')}_L{score_data['left_score']}_R{score_data['right_score']}.mp4"
+        filename = f"clip_{now.strftime('%Y%m%d_%H%M%S')}_L{score_data.left_score}_R{score_data.right_score}.mp4"
         filepath = os.path.join(self.output_dir, filename)
         
-        # Save video clip
-        height, width = clip_frames[0].shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(filepath, fourcc, 30.0, (width, height))
-        
-        for frame in clip_frames:
-            out.write(frame)
-        
-        out.release()
+        # The frame list only holds references, so the buffer keeps rotating
+        # while the writer thread encodes
+        self.clip_queue.put((filepath, clip_frames, clip_duration, score_data))
+    
+    def clip_writer_loop(self):
+        """Write queued clips off the serial and capture threads"""
+        while True:
+            job = self.clip_queue.get()
+            if job is None:  # Shutdown sentinel
+                break
+            try:
+                self.write_clip(*job)
+            except Exception as e:
+                # Keep the worker alive so later clips are still saved
+                print(f"❌ Clip save error: {e}")
+    
+    def write_clip(self, filepath, clip_frames, clip_duration, score_data):
+        """Encode a clip to disk and report it"""
+        if not (self.clip_encoder and self.write_clip_ffmpeg(filepath, clip_frames)):
+            self.write_clip_opencv(filepath, clip_frames)
         
+        filename = os.path.basename(filepath)
         print(f"🎯 CLIP SAVED: {filename} ({clip_duration:.1f}s, {len(clip_frames)} frames)")
-        print(f"   Scores - Left: {score_data['left_score']}, Right: {score_data['right_score']}")
+        print(f"   Scores - Left: {score_data.left_score}, Right: {score_data.right_score}")
         
         # Show lights that triggered save
-        lights = score_data['lights']
-        light_desc = []
-        if lights & 0x04: light_desc.append("RED")
-        if lights & 0x08: light_desc.append("GREEN") 
-        if lights & 0x01: light_desc.append("Left Off-target")
-        if lights & 0x02: light_desc.append("Right Off-target")
-        print(f"   Lights: {', '.join(light_desc) if light_desc else 'None'}")
+        print(f"   Lights: {LIGHT_DESC[score_data.lights & 0x0F]}")
+    
+    def write_clip_ffmpeg(self, filepath, clip_frames):
+        """Encode a clip with ffmpeg, falling back from NVENC to libx264"""
+        while self.clip_encoder:
+            if self.run_ffmpeg(filepath, clip_frames, self.clip_encoder):
+                return True
+            
+            if self.clip_encoder is NVENC_ARGS:
+                # Often listed by ffmpeg builds on hosts without a usable GPU
+                print("⚠️ NVENC encode failed, retrying with libx264")
+                self.clip_encoder = X264_ARGS
+            else:
+                print("⚠️ ffmpeg encode failed, falling back to OpenCV writer")
+                self.clip_encoder = None
+        return False
+    
+    def run_ffmpeg(self, filepath, clip_frames, encoder_args):
+        """Pipe the buffered JPEG frames straight into ffmpeg"""
+        command = [self.ffmpeg_path, '-y', '-loglevel', 'error',
+                   '-f', 'image2pipe', '-framerate', '30', '-c:v', 'mjpeg', '-i', '-',
+                   *encoder_args, '-pix_fmt', 'yuv420p', filepath]
+        
+        proc = None
+        try:
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+            # Submit frames in batches of 32 - one pipe write per batch
+            for i in range(0, len(clip_frames), 32):
+                proc.stdin.write(b''.join(clip_frames[i:i + 32]))
+            proc.stdin.close()
+            return proc.wait() == 0
+        except OSError as e:
+            # e.g. BrokenPipeError when ffmpeg exits early - reap it
+            print(f"⚠️ ffmpeg failed: {e}")
+            if proc:
+                proc.kill()
+                proc.wait()
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass  # Unflushed data can't reach the dead process
+            return False
+    
+    def write_clip_opencv(self, filepath, clip_frames):
+        """Decode the buffered JPEG frames and write them with OpenCV"""
+        out = None
+        for encoded in clip_frames:
+            frame = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+            if out is None:
+                # Size the writer from the real frames, not the camera's report
+                height, width = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                out = cv2.VideoWriter(filepath, fourcc, 30.0, (width, height))
+                if not out.isOpened():
+                    raise RuntimeError(f"OpenCV could not open {filepath} for writing")
+            out.write(frame)
+        
+        out.release()
     
     def video_capture_loop(self):
         """Continuous video capture and buffering"""
         print("📹 Video capture started")
         
+        # Bind per-frame lookups to locals once
+        grab = self.camera.grab
+        retrieve = self.camera.retrieve
+        imencode = cv2.imencode
+        now = time.monotonic
+        jpeg_params = self.jpeg_params
+        buffer_lock = self.buffer_lock
+        latest_frame_lock = self.latest_frame_lock
+        ring_frames = self.ring_frames
+        ring_timestamps = self.ring_timestamps
+        buffer_size = self.buffer_size
+        
         while self.running:
-            ret, frame = self.camera.read()
-            if not ret:
+            # Grab first and timestamp immediately, then decode
+            if not grab():
                 print("❌ Failed to read from camera")
                 break
             
-            # Add timestamp overlay
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cv2.putText(frame, timestamp, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
-                       0.7, (255, 255, 255), 2)
+            current_time = now()
+            ret, frame = retrieve()
+            if not ret:
+                continue
             
-            # Add recording indicator
-            if self.currently_recording:
-                cv2.circle(frame, (width - 30, 30), 10, (0, 0, 255), -1)
-                cv2.putText(frame, "REC", (width - 65, 35), cv2.FONT_HERSHEY_SIMPLEX,
-                           0.5, (0, 0, 255), 2)
+            if frame.ndim == 1 or frame.shape[0] == 1:
+                # Raw MJPG buffer from the driver - store it as-is, but drop
+                # empty buffers and ones without a JPEG start-of-image marker
+                encoded = frame
+                if encoded.size < 4 or encoded.flat[0] != 0xFF or encoded.flat[1] != 0xD8:
+                    continue
+            else:
+                if frame.ndim == 3 and frame.shape[2] == 2:
+                    # Unconverted YUYV from backends without MJPG support
+                    frame = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_YUYV)
+                ok, encoded = imencode('.jpg', frame, jpeg_params)
+                if not ok:
+                    continue
             
-            # Store frame with timestamp
-            current_time = time.time()
-            self.video_buffer.append((frame.copy(), current_time))
+            # Store encoded frame with timestamp
+            with buffer_lock:
+                index = self.ring_index
+                ring_frames[index] = encoded.tobytes()
+                ring_timestamps[index] = current_time
+                self.ring_index = (index + 1) % buffer_size
             
-            # Display live feed (optional)
-            height, width = frame.shape[:2]
-            display_frame = cv2.resize(frame, (640, 360))  # Smaller for display
-            cv2.imshow('Fencing Feed', display_frame)
+            # Hand the frame to the display thread
+            with latest_frame_lock:
+                self.latest_frame = frame
+    
+    def display_loop(self):
+        """Show the live feed at ~15fps, off the capture thread"""
+        frame_interval = 1.0 / 15
+        
+        # Bind per-frame lookups to locals once
+        imdecode = cv2.imdecode
+        resize = cv2.resize
+        pyrDown = cv2.pyrDown
+        putText = cv2.putText
+        circle = cv2.circle
+        imshow = cv2.imshow
+        waitKey = cv2.waitKey
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        width = DISPLAY_SIZE[0]
+        now = time.monotonic
+        wall_clock = time.time
+        sleep = time.sleep
+        latest_frame_lock = self.latest_frame_lock
+        
+        # The overlay only shows whole seconds, so the string is rebuilt
+        # once per second rather than every frame
+        timestamp_sec = None
+        timestamp = ""
+        
+        while self.running:
+            loop_start = now()
+            
+            with latest_frame_lock:
+                frame = self.latest_frame
+            
+            if frame is not None and (frame.ndim == 1 or frame.shape[0] == 1):
+                # Compressed frame - decode straight at half resolution.
+                # A corrupt buffer decodes to None and is just not drawn.
+                frame = imdecode(frame, cv2.IMREAD_REDUCED_COLOR_2)
+            
+            if frame is not None:
+                # Overlays are drawn on the preview only so the buffered
+                # frame stays clean. Exact halving uses the SIMD pyrDown,
+                # anything else a cheap nearest-neighbour resize
+                frame_size = (frame.shape[1], frame.shape[0])
+                if frame_size == DISPLAY_SIZE:
+                    display_frame = frame
+                elif frame_size == (DISPLAY_SIZE[0] * 2, DISPLAY_SIZE[1] * 2):
+                    display_frame = pyrDown(frame)
+                else:
+                    display_frame = resize(frame, DISPLAY_SIZE, interpolation=cv2.INTER_NEAREST)
+                
+                # Add timestamp overlay
+                now_sec = int(wall_clock())
+                if now_sec != timestamp_sec:
+                    timestamp_sec = now_sec
+                    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now_sec))
+                putText(display_frame, timestamp, (10, 30), font, 0.7, (255, 255, 255), 2)
+                
+                # Add recording indicator
+                if self.currently_recording:
+                    circle(display_frame, (width - 30, 30), 10, (0, 0, 255), -1)
+                    putText(display_frame, "REC", (width - 65, 35), font, 0.5, (0, 0, 255), 2)
+                
+                imshow('Fencing Feed', display_frame)
             
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if waitKey(1) & 0xFF == ord('q'):
                 self.stop()
                 break
+            
+            sleep(max(0.0, frame_interval - (now() - loop_start)))
+    
+    def read_serial_packet(self):
+        """Read one 10-byte packet from the FA5, resyncing on the 0xFF marker"""
+        packet = self.fa5_serial.read(10)
+        if len(packet) != 10:
+            return None  # Read timed out
+        
+        start = packet.find(b'\xff')
+        if start < 0:
+            return None  # No start marker in this chunk
+        
+        if start > 0:
+            # Out of sync - keep the tail from the marker and read the rest
+            packet = packet[start:] + self.fa5_serial.read(start)
+            if len(packet) != 10:
+                return None
+        
+        return packet
     
     def serial_monitoring_loop(self):
         """Monitor FA5 serial data for scoring events"""
@@ -257,30 +569,35 @@ class FencingVideoRecorder:
         while self.running:
             try:
                 packet = None
+                data = None
                 
                 if self.test_mode:
                     # Test mode - use simulated data
                     if self.test_data:
-                        packet = self.get_test_packet()
+                        # Checksums were verified by preparse_test_data
+                        data = self.get_test_packet()
                     else:
                         packet = self.simulate_realistic_packet()
                     
                     time.sleep(1)  # Simulate 1Hz packet rate
                     
-                elif self.fa5_serial and self.fa5_serial.in_waiting >= 10:
-                    # Real FA5 data
-                    packet = self.fa5_serial.read(10)
+                elif self.fa5_serial:
+                    # Real FA5 data - blocks in the driver until bytes arrive
+                    packet = self.read_serial_packet()
                 
-                if packet:
+                # Unchanged packets (e.g. timer stopped) are skipped on the
+                # raw bytes before any parsing happens
+                if packet and packet != self.last_raw_packet:
+                    self.last_raw_packet = packet
                     data = self.parse_favero_packet(packet)
+                
+                if data and data != self.last_packet:
+                    # Print packet info in test mode
+                    if self.test_mode:
+                        print(f"📦 Test packet: {data}")
                     
-                    if data and data != self.last_packet:
-                        # Print packet info in test mode
-                        if self.test_mode:
-                            print(f"📦 Test packet: {data}")
-                        
-                        self.detect_clip_events(data)
-                        self.last_packet = data
+                    self.detect_clip_events(data)
+                    self.last_packet = data
                         
             except Exception as e:
                 print(f"❌ Serial error: {e}")
@@ -296,10 +613,18 @@ class FencingVideoRecorder:
         
         self.running = True
         
+        # Start clip writer thread
+        self.clip_writer_thread = threading.Thread(target=self.clip_writer_loop)
+        self.clip_writer_thread.start()
+        
         # Start video capture thread
         self.video_thread = threading.Thread(target=self.video_capture_loop)
         self.video_thread.start()
         
+        # Start display thread
+        self.display_thread = threading.Thread(target=self.display_loop)
+        self.display_thread.start()
+        
         # Start serial monitoring thread
         if self.test_mode or self.fa5_serial:
             self.serial_thread = threading.Thread(target=self.serial_monitoring_loop)
@@ -319,15 +644,18 @@ class FencingVideoRecorder:
                 while self.running:
                     key = input().lower()
                     if key == 's':
-                        if not self.currently_recording:
-                            self.recording_start_time = time.time()
-                            self.currently_recording = True
-                            print("⚔️ Manual recording started")
+                        with self.state_lock:
+                            if not self.currently_recording:
+                                self.recording_start_time = time.monotonic()
+                                self.currently_recording = True
+                                print("⚔️ Manual recording started")
                     elif key == 'e':
-                        if self.currently_recording:
-                            fake_data = {'left_score': 1, 'right_score': 0, 'lights': 0x04}
-                            self.save_video_clip(self.recording_start_time, time.time(), fake_data)
-                            self.currently_recording = False
+                        with self.state_lock:
+                            if self.currently_recording:
+                                fake_data = FaveroPacket(right_score=0, left_score=1, seconds=0, minutes=0,
+                                                         lights=0x04, matches=0, cards=0)
+                                self.save_video_clip(self.recording_start_time, time.monotonic(), fake_data)
+                                self.currently_recording = False
                     elif key == 'q':
                         self.stop()
                         break
@@ -339,11 +667,17 @@ class FencingVideoRecorder:
         print("🛑 Stopping recorder...")
         self.running = False
         
-        if self.video_thread:
-            self.video_thread.join()
-        
-        if self.serial_thread:
-            self.serial_thread.join()
+        # stop() may be called from one of the worker threads (e.g. 'q' in
+        # the display window), which must not join itself
+        current = threading.current_thread()
+        for thread in (self.video_thread, self.display_thread, self.serial_thread):
+            if thread and thread is not current:
+                thread.join()
+        
+        # Let the writer finish any queued clips before exiting
+        if self.clip_writer_thread:
+            self.clip_queue.put(None)
+            self.clip_writer_thread.join()
         
         if self.fa5_serial:
             self.fa5_serial.close()
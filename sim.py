@@ -1,11 +1,51 @@
-import serial
+import os
+import sys
 import time
 import threading
 import random
 from dataclasses import dataclass
-from typing import Optional
+from struct import Struct
 
-@dataclass
+# 10-byte FA5 packet, one unsigned byte per field. pack_packet is the
+# bound C-level packer used on the per-tick path.
+PACKET = Struct('<10B')
+pack_packet = PACKET.pack_into
+
+# Fencer and hit-type codes for the simulate-hit fast path
+LEFT = 0
+RIGHT = 1
+VALID = 0
+OFF_TARGET = 1
+
+FENCERS = {"left": LEFT, "right": RIGHT}
+
+# (fencer, hit type) -> (lights, fencer who scores or None, message).
+# Lights: red 0x04 / green 0x08 for valid hits, left 0x01 / right 0x02 white
+# for off-target.
+HITS = {
+    (LEFT, VALID): (0x04, LEFT, "⚔️ LEFT FENCER HIT! (Red light)"),
+    (LEFT, OFF_TARGET): (0x01, None, "⚪ Left fencer off-target"),
+    (RIGHT, VALID): (0x08, RIGHT, "⚔️ RIGHT FENCER HIT! (Green light)"),
+    (RIGHT, OFF_TARGET): (0x02, None, "⚪ Right fencer off-target"),
+}
+
+# Light bits in byte 5 and their names
+LIGHT_NAMES = (
+    (0x01, "Left White"),
+    (0x02, "Right White"),
+    (0x04, "RED (Left Hit)"),
+    (0x08, "GREEN (Right Hit)"),
+    (0x10, "Right Yellow"),
+    (0x20, "Left Yellow"),
+)
+
+# Decoded description for every value of the 6 light bits
+LIGHT_TABLE = [
+    ', '.join(name for mask, name in LIGHT_NAMES if lights & mask) or 'None'
+    for lights in range(64)
+]
+
+@dataclass(slots=True)
 class FencingState:
     left_score: int = 0
     right_score: int = 0
@@ -17,11 +57,23 @@ class FencingState:
     timer_running: bool = False
 
 class FA5Simulator:
-    def __init__(self, virtual_port_name='FENCING_SIM'):
+    def __init__(self, virtual_port_name='FENCING_SIM', verbose=False, log_every=1):
         self.state = FencingState()
         self.running = False
         self.thread = None
         
+        # Set by stop() to interrupt scheduled waits (simulation loop ticks,
+        # automatic bouts)
+        self.stop_event = threading.Event()
+        
+        # Packet logging from the simulation loop (one line every N ticks)
+        self.verbose = verbose
+        self.log_every = log_every
+        
+        # Packet buffer reused by create_packet
+        self._packet = bytearray(PACKET.size)
+        self._packet_view = memoryview(self._packet)
+        
         # Create virtual serial ports (Windows: use com0com, Linux: socat)
         self.sim_port = None
         self.client_port_name = None
@@ -31,58 +83,48 @@ class FA5Simulator:
     
     def create_packet(self) -> bytes:
         """Create a 10-byte FA5 packet from current state"""
-        packet = bytearray(10)
-        
-        # Byte 0: Start marker (always 0xFF)
-        packet[0] = 0xFF
-        
-        # Byte 1: Right fencer score
-        packet[1] = self.state.right_score
-        
-        # Byte 2: Left fencer score  
-        packet[2] = self.state.left_score
-        
-        # Byte 3: Seconds
-        packet[3] = self.state.seconds
-        
-        # Byte 4: Minutes
-        packet[4] = self.state.minutes
-        
-        # Byte 5: Light states
-        packet[5] = self.state.lights
-        
-        # Byte 6: Matches and priority
-        packet[6] = self.state.matches
-        
-        # Byte 7: Always 0x00
-        packet[7] = 0x00
+        return bytes(self.create_packet_view())
+    
+    def create_packet_view(self) -> memoryview:
+        """Create the packet in place and return a zero-copy view of it"""
+        # The view is overwritten by the next call - use create_packet()
+        # for a packet that needs to be kept
+        s = self.state
+        right = s.right_score
+        left = s.left_score
+        seconds = s.seconds
+        minutes = s.minutes
+        lights = s.lights
+        matches = s.matches
+        cards = s.cards
         
-        # Byte 8: Penalty cards
-        packet[8] = self.state.cards
+        # Checksum: sum of bytes 0-8 mod 256 (byte 0 is 0xFF, byte 7 is 0x00)
+        checksum = (0xFF + right + left + seconds + minutes + lights + matches + cards) & 0xFF
         
-        # Byte 9: Checksum (sum of bytes 0-8 mod 256)
-        packet[9] = sum(packet[:9]) % 256
+        # Layout: start marker, right score, left score, seconds, minutes,
+        # lights, matches/priority, 0x00, penalty cards, checksum
+        pack_packet(self._packet, 0, 0xFF, right, left, seconds, minutes,
+                    lights, matches, 0x00, cards, checksum)
         
-        return bytes(packet)
+        return self._packet_view
     
-    def print_packet_info(self, packet: bytes):
+    def print_packet_info(self, packet: bytes | memoryview):
         """Print human-readable packet information"""
-        print(f"📦 Packet: {' '.join(f'{b:02X}' for b in packet)}")
-        print(f"   Timer: {self.state.minutes}:{self.state.seconds:02d}")
-        print(f"   Scores: L{self.state.left_score} - R{self.state.right_score}")
-        
-        # Decode lights
-        lights = self.state.lights
-        light_status = []
-        if lights & 0x01: light_status.append("Left White")
-        if lights & 0x02: light_status.append("Right White") 
-        if lights & 0x04: light_status.append("RED (Left Hit)")
-        if lights & 0x08: light_status.append("GREEN (Right Hit)")
-        if lights & 0x10: light_status.append("Right Yellow")
-        if lights & 0x20: light_status.append("Left Yellow")
-        
-        print(f"   Lights: {', '.join(light_status) if light_status else 'None'}")
-        print()
+        # Built as one string so it goes out in a single write
+        s = self.state
+        sys.stdout.write(
+            f"📦 Packet: {packet.hex(' ').upper()}\n"
+            f"   Timer: {s.minutes}:{s.seconds:02d}\n"
+            f"   Scores: L{s.left_score} - R{s.right_score}\n"
+            f"   Lights: {LIGHT_TABLE[s.lights & 0x3F]}\n"
+            f"\n"
+        )
+    
+    def _format_line(self, packet: bytes | memoryview) -> str:
+        """Format a packet as a single log line"""
+        s = self.state
+        return (f"📦 {packet.hex(' ').upper()} | {s.minutes}:{s.seconds:02d} | "
+                f"L{s.left_score} - R{s.right_score} | {LIGHT_TABLE[s.lights & 0x3F]}\n")
     
     def start_timer(self):
         """Start the bout timer"""
@@ -96,29 +138,26 @@ class FA5Simulator:
     
     def simulate_hit(self, fencer: str, hit_type: str = "valid"):
         """Simulate a hit by a fencer"""
-        if fencer.lower() == "left":
-            if hit_type == "valid":
-                self.state.lights = 0x04  # Red light (bit 2)
-                self.state.left_score += 1
-                print("⚔️ LEFT FENCER HIT! (Red light)")
-            else:  # off-target
-                self.state.lights = 0x01  # Left white light (bit 0)
-                print("⚪ Left fencer off-target")
-        
-        elif fencer.lower() == "right":
-            if hit_type == "valid":
-                self.state.lights = 0x08  # Green light (bit 3)  
-                self.state.right_score += 1
-                print("⚔️ RIGHT FENCER HIT! (Green light)")
-            else:  # off-target
-                self.state.lights = 0x02  # Right white light (bit 1)
-                print("⚪ Right fencer off-target")
+        code = FENCERS.get(fencer.lower())
+        if code is not None:
+            self._simulate_hit(code, VALID if hit_type == "valid" else OFF_TARGET)
+    
+    def _simulate_hit(self, fencer: int, hit_type: int):
+        """Simulate a hit using LEFT/RIGHT and VALID/OFF_TARGET codes"""
+        lights, scorer, message = HITS[fencer, hit_type]
+        s = self.state
+        s.lights = lights
+        if scorer == LEFT:
+            s.left_score += 1
+        elif scorer == RIGHT:
+            s.right_score += 1
+        print(message)
     
     def simulate_double_hit(self):
         """Simulate both fencers hitting simultaneously"""
         self.state.lights = 0x0C  # Both red and green (bits 2+3)
         # In sabre, usually one gets the point based on right-of-way
-        if random.choice([True, False]):
+        if random.getrandbits(1):
             self.state.left_score += 1
             print("⚔️⚔️ DOUBLE HIT! Left fencer gets point (right-of-way)")
         else:
@@ -132,15 +171,17 @@ class FA5Simulator:
     
     def tick_timer(self):
         """Advance timer by one second"""
-        if self.state.timer_running:
-            if self.state.seconds > 0:
-                self.state.seconds -= 1
-            elif self.state.minutes > 0:
-                self.state.minutes -= 1
-                self.state.seconds = 59
+        s = self.state
+        if s.timer_running:
+            seconds = s.seconds
+            if seconds > 0:
+                s.seconds = seconds - 1
+            elif s.minutes > 0:
+                s.minutes -= 1
+                s.seconds = 59
             else:
                 # Time expired
-                self.state.timer_running = False
+                s.timer_running = False
                 print("⏰ TIME EXPIRED!")
     
     def reset_bout(self):
@@ -152,37 +193,97 @@ class FA5Simulator:
         """Run the main simulation sending packets"""
         print(f"🚀 Starting FA5 simulation...")
         
-        if output_file:
-            # Write to file for testing
-            with open(output_file, 'wb') as f:
-                while self.running:
-                    packet = self.create_packet()
-                    f.write(packet)
-                    f.flush()
-                    
-                    self.print_packet_info(packet)
-                    self.tick_timer()
-                    time.sleep(1)  # Send packet every second
-        else:
-            # Just print packets for debugging
+        # Write to file for testing; packets are logged when verbose.
+        # Packets are batched in _out_buf and written straight to the raw fd
+        # once it reaches 4 KB or has been pending for half a second.
+        # O_BINARY stops the Windows CRT from turning 0x0A into CR LF.
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        fd = os.open(output_file, flags, 0o644) if output_file else None
+        self._out_buf = bytearray()
+        last_flush = last_log_flush = time.monotonic()
+        tick = 0
+        
+        try:
+            # Ticks are scheduled against absolute monotonic deadlines so
+            # sleep overshoot does not accumulate into drift
+            deadline = time.monotonic()
             while self.running:
-                packet = self.create_packet()
-                self.print_packet_info(packet)
+                # Packet is consumed within this tick, so no copy is needed
+                packet = self.create_packet_view()
+                if fd is not None:
+                    self._out_buf += packet
+                    now = time.monotonic()
+                    if len(self._out_buf) >= 4096 or now - last_flush > 0.5:
+                        self._flush_out(fd)
+                        last_flush = now
+                
+                if self.verbose and tick % self.log_every == 0:
+                    sys.stdout.write(self._format_line(packet))
+                    now = time.monotonic()
+                    if now - last_log_flush >= 1.0:
+                        sys.stdout.flush()
+                        last_log_flush = now
+                
                 self.tick_timer()
-                time.sleep(1)
+                tick += 1
+                
+                # Send packet every second; stop() wakes the wait immediately
+                deadline += 1.0
+                if self.stop_event.wait(max(0.0, deadline - time.monotonic())):
+                    break
+        finally:
+            if fd is not None:
+                try:
+                    # Flush the tail on stop
+                    self._flush_out(fd)
+                finally:
+                    os.close(fd)
+            if self.verbose:
+                sys.stdout.flush()
+    
+    def _flush_out(self, fd: int):
+        """Write all of _out_buf to fd, retrying after short writes"""
+        # FIFOs and ptys may accept only part of the buffer per call
+        with memoryview(self._out_buf) as view:
+            written = 0
+            while written < len(view):
+                written += os.write(fd, view[written:])
+        self._out_buf.clear()
     
     def start(self, output_file: str = None):
         """Start the simulator"""
         self.running = True
+        self.stop_event.clear()
         self.thread = threading.Thread(target=self.run_simulation_loop, args=(output_file,))
         self.thread.start()
         
     def stop(self):
         """Stop the simulator"""
         self.running = False
+        self.stop_event.set()
         if self.thread:
             self.thread.join()
 
+# Sentinel for the commands that leave the interactive loop
+QUIT = object()
+
+# Interactive command table: command -> handler taking the simulator
+COMMANDS = {
+    "quit": QUIT,
+    "q": QUIT,
+    "start": FA5Simulator.start_timer,
+    "stop": FA5Simulator.stop_timer,
+    "left": lambda sim: sim._simulate_hit(LEFT, VALID),
+    "right": lambda sim: sim._simulate_hit(RIGHT, VALID),
+    "leftoff": lambda sim: sim._simulate_hit(LEFT, OFF_TARGET),
+    "rightoff": lambda sim: sim._simulate_hit(RIGHT, OFF_TARGET),
+    "double": FA5Simulator.simulate_double_hit,
+    "clear": FA5Simulator.clear_lights,
+    "reset": FA5Simulator.reset_bout,
+    "auto": lambda sim: run_automatic_bout(sim),
+    "packet": lambda sim: sim.print_packet_info(sim.create_packet_view()),
+}
+
 def interactive_simulation():
     """Interactive mode to manually control the simulator"""
     sim = FA5Simulator()
@@ -206,31 +307,11 @@ def interactive_simulation():
         try:
             cmd = input("FA5> ").strip().lower()
             
-            if cmd == "quit" or cmd == "q":
+            handler = COMMANDS.get(cmd)
+            if handler is QUIT:
                 break
-            elif cmd == "start":
-                sim.start_timer()
-            elif cmd == "stop":
-                sim.stop_timer()
-            elif cmd == "left":
-                sim.simulate_hit("left", "valid")
-            elif cmd == "right":
-                sim.simulate_hit("right", "valid")
-            elif cmd == "leftoff":
-                sim.simulate_hit("left", "off-target")
-            elif cmd == "rightoff":
-                sim.simulate_hit("right", "off-target")
-            elif cmd == "double":
-                sim.simulate_double_hit()
-            elif cmd == "clear":
-                sim.clear_lights()
-            elif cmd == "reset":
-                sim.reset_bout()
-            elif cmd == "auto":
-                run_automatic_bout(sim)
-            elif cmd == "packet":
-                packet = sim.create_packet()
-                sim.print_packet_info(packet)
+            elif handler:
+                handler(sim)
             else:
                 print("❌ Unknown command")
                 
@@ -239,38 +320,53 @@ def interactive_simulation():
     
     print("👋 Simulator stopped")
 
+def _bout_stopped(sim: FA5Simulator, timeout: float) -> bool:
+    """Wait up to timeout; report and return True if stop() was called"""
+    if sim.stop_event.wait(timeout):
+        print("⏹️ Automatic bout stopped")
+        return True
+    return False
+
 def run_automatic_bout(sim: FA5Simulator):
     """Run a realistic automatic bout simulation"""
     print("\n🤖 Running automatic bout simulation...")
     
-    # Reset and start
+    # Reset and start. stop_event is only cleared by start(), so a stop()
+    # issued before the bout began still ends it.
     sim.reset_bout()
-    time.sleep(1)
+    if _bout_stopped(sim, 1):
+        return
     
     print("En garde... Ready... Fence!")
     sim.start_timer()
     
     # Simulate a realistic bout with multiple exchanges
     exchanges = [
-        (3, "left", "valid"),      # Left hits after 3 seconds
+        (3, "left", VALID),        # Left hits after 3 seconds
         (2, "clear", None),        # Clear lights
-        (4, "right", "off-target"), # Right off-target
+        (4, "right", OFF_TARGET),  # Right off-target
         (1, "clear", None),        # Clear
         (5, "double", None),       # Double hit
         (2, "clear", None),        # Clear
-        (6, "right", "valid"),     # Right scores
+        (6, "right", VALID),       # Right scores
         (3, "clear", None),        # Clear
-        (4, "left", "valid"),      # Left scores
+        (4, "left", VALID),        # Left scores
         (2, "stop", None),         # Halt
     ]
     
+    # Each exchange fires at a fixed offset from the start, so waits do not
+    # accumulate drift; stop() interrupts the wait immediately
+    base = time.monotonic()
+    offset = 0
     for delay, action, target in exchanges:
-        time.sleep(delay)
+        offset += delay
+        if _bout_stopped(sim, max(0.0, base + offset - time.monotonic())):
+            return
         
         if action == "left":
-            sim.simulate_hit("left", target)
+            sim._simulate_hit(LEFT, target)
         elif action == "right":
-            sim.simulate_hit("right", target)
+            sim._simulate_hit(RIGHT, target)
         elif action == "double":
             sim.simulate_double_hit()
         elif action == "clear":
@@ -282,13 +378,13 @@ def run_automatic_bout(sim: FA5Simulator):
 
 def create_test_data_file():
     """Create a binary file with test FA5 packets for debugging"""
-    filename = "fa5_test_data.bin"
+    # Imported here so the simulator itself starts without numpy
+    import numpy as np
     
-    sim = FA5Simulator()
-    packets = []
+    filename = "fa5_test_data.bin"
     
     # Create various test scenarios
-    scenarios = [
+    scenarios = np.array([
         # Timer counting down
         (3, 0, 0, 0, 0),  # 3:00, no lights
         (2, 59, 0, 0, 0), # 2:59, no lights  
@@ -305,22 +401,27 @@ def create_test_data_file():
         # Double hit
         (2, 50, 2, 1, 0x0C), # Both lights
         (2, 50, 2, 1, 0x00), # Cleared
-    ]
+    ], dtype=np.uint8)
+    minutes, seconds, left_scores, right_scores, lights = scenarios.T
+    
+    # Build every packet at once; match and card bytes use the state defaults
+    defaults = FencingState()
+    packets = np.zeros((len(scenarios), PACKET.size), dtype=np.uint8)
+    packets[:, 0] = 0xFF
+    packets[:, 1] = right_scores
+    packets[:, 2] = left_scores
+    packets[:, 3] = seconds
+    packets[:, 4] = minutes
+    packets[:, 5] = lights
+    packets[:, 6] = defaults.matches
+    packets[:, 8] = defaults.cards
+    packets[:, 9] = packets[:, :9].sum(axis=1, dtype=np.uint8)  # Wraps mod 256
     
     with open(filename, 'wb') as f:
-        for minutes, seconds, left_score, right_score, lights in scenarios:
-            sim.state.minutes = minutes
-            sim.state.seconds = seconds  
-            sim.state.left_score = left_score
-            sim.state.right_score = right_score
-            sim.state.lights = lights
-            
-            packet = sim.create_packet()
-            f.write(packet)
-            packets.append(packet)
+        packets.tofile(f)
     
     print(f"📁 Created test data file: {filename}")
-    print(f"   Contains {len(packets)} packets ({len(packets) * 10} bytes)")
+    print(f"   Contains {len(packets)} packets ({packets.nbytes} bytes)")
     
     return filename
 